@@ -6,6 +6,8 @@ import os
 
 logger = logging.getLogger(__name__)
 
+REPORT_ERROR_PREFIX = "Unable to generate report."
+
 AIDEN_SYSTEM_PROMPT = """You are Aiden, a spiritual mentor with this exact energy:
 
 🧭 YOUR 5-STEP FRAMEWORK (USE THIS FOR EVERY SECTION):
@@ -38,7 +40,7 @@ AIDEN_SYSTEM_PROMPT = """You are Aiden, a spiritual mentor with this exact energ
 - Name the season/cycle/pattern explicitly
 - People need something earth-side to touch—make it real"""
 
-def generate_report_content(name, birthdate, birthtime, birthplace, report_type, spiritual_focus):
+def generate_report_content(name, birthdate, birthtime, birthplace, report_type, spiritual_focus, chart_data=None):
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         logger.error("OPENAI_API_KEY not set")
@@ -46,12 +48,14 @@ def generate_report_content(name, birthdate, birthtime, birthplace, report_type,
     
     client = OpenAI(api_key=api_key)
     
-    try:
-        chart_data = calculate_chart(birthdate, birthtime, birthplace)
-        logger.info(f"Chart calculated: {chart_data}")
-    except Exception as e:
-        logger.error(f"Error calculating chart: {e}")
-        chart_data = {}
+    # Callers that already calculated the chart (e.g. bulk_regenerate) pass it in
+    if chart_data is None:
+        try:
+            chart_data = calculate_chart(birthdate, birthtime, birthplace)
+            logger.info(f"Chart calculated: {chart_data}")
+        except Exception as e:
+            logger.error(f"Error calculating chart: {e}")
+            chart_data = {}
     
     planets = chart_data.get('planets', {})
     sun_sign = planets.get('Sun', {}).get('sign', 'Unknown')
@@ -307,14 +311,14 @@ CRITICAL RULES:
         return response.choices[0].message.content
     except Exception as e:
         logger.error(f"Error generating {report_type}: {e}")
-        return f"Unable to generate report. Error: {str(e)}"
+        return f"{REPORT_ERROR_PREFIX} Error: {str(e)}"
 
 def get_sign_from_degree(degree):
     signs = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo', 'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces']
     sign_index = int(degree / 30)
     return signs[sign_index % 12]
 
-def generate_pdf(name, birthdate, birthtime, birthplace, report_type, spiritual_focus, content):
+def generate_pdf(name, birthdate, birthtime, birthplace, report_type, spiritual_focus, content, output_dir="/tmp"):
     pdf = FPDF()
     pdf.add_page()
     
@@ -339,7 +343,7 @@ def generate_pdf(name, birthdate, birthtime, birthplace, report_type, spiritual_
     content_clean = content.encode('latin-1', errors='replace').decode('latin-1')
     pdf.multi_cell(0, 5, content_clean)
     
-    filename = f"/tmp/{name.replace(' ', '_')}_chart.pdf"
+    filename = os.path.join(output_dir, f"{name.replace(' ', '_')}_chart.pdf")
     pdf.output(filename)
     logger.info(f"PDF generated: {filename}")
     return filename
@@ -0,0 +1,257 @@
+"""Offline bulk regeneration of reports.
+
+Reads orders from a CSV or JSONL file and regenerates each report without
+replaying webhooks. Chart calculation and PDF rendering run in a process pool,
+LLM calls are bounded by --llm-concurrency, and every finished order is
+appended to a checkpoint file so an interrupted run can be resumed.
+
+Usage:
+    python bulk_regenerate.py orders.csv --output-dir regenerated [--send-email]
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from astrology_calc import calculate_chart
+from birth_report import REPORT_ERROR_PREFIX, generate_report_content, generate_pdf
+from main import ref_map, report_type_map, send_delivery_email
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ["name", "email", "birthdate", "birthtime", "birthplace", "report_type"]
+
+# Nominatim's usage policy allows roughly one geocoding request per second
+GEOCODE_INTERVAL = 1.0
+
+def normalize_order(row):
+    """Map Tally question keys to field names and resolve report type IDs"""
+    order = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        field = ref_map.get(key, key)
+        # Raw Tally dropdown answers are a list of option IDs, same as main.by_ref
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if isinstance(value, str):
+            value = value.strip()
+        order[field] = value or None
+    if order.get("report_type"):
+        order["report_type"] = report_type_map.get(order["report_type"], order["report_type"])
+    return order
+
+def order_key(order):
+    """Stable identifier used for checkpointing and as the output directory name"""
+    if order.get("order_id"):
+        order_id = str(order["order_id"])
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", order_id)
+        if safe == order_id:
+            return safe
+        # Keep altered IDs distinct, e.g. "a/b" vs "a_b"
+        return f"{safe}-{hashlib.sha1(order_id.encode('utf-8')).hexdigest()[:8]}"
+    raw = "|".join(str(order.get(field) or "") for field in REQUIRED_FIELDS)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+def load_orders(path):
+    """Read orders from a .csv or .jsonl file"""
+    # utf-8-sig drops the byte-order mark spreadsheet tools put before the first header
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [normalize_order(row) for row in rows]
+
+def load_checkpoint(path):
+    """Return the latest checkpoint entry for each order key"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                logger.warning(f"Skipping unreadable checkpoint line: {line.strip()}")
+                continue
+            entries[entry["key"]] = entry
+    return entries
+
+def record_checkpoint(path, key, status, **details):
+    """Append one order's outcome to the checkpoint file"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": key, "status": status, **details}) + "\n")
+
+def positive_int(value):
+    """argparse type for options that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+class Progress:
+    """Tracks completed orders and logs throughput"""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def update(self, ok, label):
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+        finished = self.done + self.failed
+        elapsed = time.monotonic() - self.started
+        rate = finished / elapsed * 60 if elapsed else 0.0
+        logger.info(f"[{finished}/{self.total}] {'✅' if ok else '❌'} {label} "
+                    f"({rate:.1f} orders/min, {elapsed:.0f}s elapsed)")
+
+class GeocodeThrottle:
+    """Serializes chart calculations so geocoding stays within GEOCODE_INTERVAL"""
+
+    def __init__(self, interval=GEOCODE_INTERVAL):
+        self.interval = interval
+        self.lock = asyncio.Lock()
+        self.last = 0.0
+
+    async def __aenter__(self):
+        await self.lock.acquire()
+        wait = self.last + self.interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, *exc):
+        self.last = time.monotonic()
+        self.lock.release()
+
+async def regenerate_order(order, key, output_dir, pool, llm_executor, geocode, send, checkpoint_path,
+                           progress, pdf_path=None):
+    """Chart -> content -> PDF -> (optional) email for a single order
+
+    If pdf_path is given the report was already generated, so only the email is sent.
+    """
+    loop = asyncio.get_running_loop()
+    label = f"{order.get('report_type')} for {order.get('name')} [{key}]"
+    try:
+        missing = [field for field in REQUIRED_FIELDS if not order.get(field)]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+        name = order["name"]
+        birthdate = order["birthdate"]
+        birthtime = order["birthtime"]
+        birthplace = order["birthplace"]
+        report_type = order["report_type"]
+        spiritual_focus = order.get("spiritual_focus")
+
+        if pdf_path is None:
+            # Unlike the webhook, no fallback to an empty chart: a report without
+            # placements must stay "failed" so the next run retries it
+            async with geocode:
+                chart_data = await loop.run_in_executor(pool, calculate_chart, birthdate, birthtime, birthplace)
+
+            content = await loop.run_in_executor(llm_executor, generate_report_content, name, birthdate,
+                                                 birthtime, birthplace, report_type, spiritual_focus, chart_data)
+            if content.startswith(REPORT_ERROR_PREFIX):
+                raise RuntimeError(content)
+
+            # Absolute so the checkpointed pdf_path still resolves when resuming from another directory
+            order_dir = os.path.abspath(os.path.join(output_dir, key))
+            os.makedirs(order_dir, exist_ok=True)
+            pdf_path = await loop.run_in_executor(pool, generate_pdf, name, birthdate, birthtime, birthplace,
+                                                  report_type, spiritual_focus, content, order_dir)
+
+        if send:
+            await asyncio.to_thread(send_delivery_email, name, order["email"], report_type, pdf_path)
+
+        record_checkpoint(checkpoint_path, key, "done", pdf_path=pdf_path, emailed=send)
+        progress.update(True, label)
+    except Exception as e:
+        logger.error(f"Regeneration failed for {label}: {str(e)}")
+        # Keep a PDF that was rendered before the email failed so a rerun only resends it
+        record_checkpoint(checkpoint_path, key, "failed", error=str(e), pdf_path=pdf_path)
+        progress.update(False, label)
+
+async def run(orders, output_dir, pool, llm_concurrency, send, checkpoint_path):
+    entries = load_checkpoint(checkpoint_path)
+    pending = []
+    seen = set()
+    for order in orders:
+        key = order_key(order)
+        if key in seen:
+            continue
+        seen.add(key)
+        entry = entries.get(key, {})
+        if entry.get("status") == "done" and (not send or entry.get("emailed")):
+            continue
+        # Generated on an earlier run but not emailed (no --send-email, or the send failed):
+        # never pay for another LLM call, just deliver the existing PDF when asked to
+        pdf_path = entry.get("pdf_path")
+        if pdf_path and os.path.exists(pdf_path):
+            if not send:
+                continue
+        else:
+            pdf_path = None
+        pending.append((key, order, pdf_path))
+
+    skipped = len(orders) - len(pending)
+    if skipped:
+        logger.info(f"Skipping {skipped} orders already generated or duplicated")
+
+    progress = Progress(len(pending))
+    geocode = GeocodeThrottle()
+    # Own executor so --llm-concurrency isn't capped by the default pool or shared with email sends
+    with ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="llm") as llm_executor:
+        await asyncio.gather(*(
+            regenerate_order(order, key, output_dir, pool, llm_executor, geocode, send, checkpoint_path,
+                             progress, pdf_path)
+            for key, order, pdf_path in pending
+        ))
+    return progress, skipped
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate reports in bulk from a CSV/JSONL order file")
+    parser.add_argument("orders", help="CSV or JSONL file with the same fields as the Tally webhook")
+    parser.add_argument("--output-dir", default="regenerated", help="Directory for generated PDFs")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1,
+                        help="Processes for chart calculation and PDF rendering")
+    parser.add_argument("--llm-concurrency", type=positive_int, default=4, help="Maximum concurrent LLM calls")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output-dir>/checkpoint.jsonl)")
+    parser.add_argument("--send-email", action="store_true", help="Email each report to the customer")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = args.checkpoint or os.path.join(args.output_dir, "checkpoint.jsonl")
+
+    orders = load_orders(args.orders)
+    logger.info(f"Loaded {len(orders)} orders from {args.orders}")
+
+    # Spawn rather than fork: the event loop and LLM threads are already running when workers start
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        progress, skipped = asyncio.run(
+            run(orders, args.output_dir, pool, args.llm_concurrency, args.send_email, checkpoint_path)
+        )
+
+    elapsed = time.monotonic() - progress.started
+    rate = (progress.done + progress.failed) / elapsed * 60 if elapsed else 0.0
+    logger.info(f"Finished: {progress.done} done, {progress.failed} failed, {skipped} skipped "
+                f"in {elapsed:.0f}s ({rate:.1f} orders/min)")
+    return 1 if progress.failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
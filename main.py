@@ -87,6 +87,19 @@ def send_email(to_email: str, subject: str, html_content: str, attachment_path:
         logger.error(f"❌ Email send failed: {str(e)}")
         raise
 
+def send_delivery_email(name: str, email: str, report_type: str, pdf_path: str):
+    """Send the finished report as an attachment"""
+    delivery_html = f"""
+    <h2>🌟 Your {report_type} Has Arrived</h2>
+    <p>Dear {name.split()[0]},</p>
+    <p>Your personalized <strong>{report_type}</strong> is attached to this email.</p>
+    <p>Take your time exploring the insights within. This is your cosmic roadmap.</p>
+    <p>If you have questions or want to go deeper, simply reply to this email.</p>
+    <p>With cosmic love,<br>Athyna Luna 🌙</p>
+    """
+    send_email(email, f"🌟 Your {report_type} Has Arrived", delivery_html, pdf_path)
+    logger.info(f"Delivery email sent to {email}")
+
 async def process_report(name: str, email: str, birthdate: str, birthtime: str, 
                         birthplace: str, report_type: str, spiritual_focus: str):
     """Background task to generate and send report"""
@@ -108,16 +121,7 @@ async def process_report(name: str, email: str, birthdate: str, birthtime: str,
         logger.info(f"Report generated: {pdf_path}")
         
         # Send delivery email with attachment
-        delivery_html = f"""
-        <h2>🌟 Your {report_type} Has Arrived</h2>
-        <p>Dear {name.split()[0]},</p>
-        <p>Your personalized <strong>{report_type}</strong> is attached to this email.</p>
-        <p>Take your time exploring the insights within. This is your cosmic roadmap.</p>
-        <p>If you have questions or want to go deeper, simply reply to this email.</p>
-        <p>With cosmic love,<br>Athyna Luna 🌙</p>
-        """
-        send_email(email, f"🌟 Your {report_type} Has Arrived", delivery_html, pdf_path)
-        logger.info(f"Delivery email sent to {email}")
+        send_delivery_email(name, email, report_type, pdf_path)
         
     except Exception as e:
         logger.error(f"Report generation failed: {str(e)}")